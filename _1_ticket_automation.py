@@ -5,19 +5,41 @@ Handles all formats + adds error rows to sheet
 
 import io
 import os
+
+# One core per tesseract instance - parallelism comes from the page thread pool.
+# OpenMP reads this when libtesseract loads, so it must be set before the imports below.
+os.environ["OMP_THREAD_LIMIT"] = "1"
+
 import re
 import json
+import hashlib
+import functools
+import time
+import random
+import queue
+import threading
+import multiprocessing
+import asyncio
 import requests
-from typing import List, Dict, Optional, Tuple
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional, Tuple
 from datetime import datetime
 
+import cv2
 import fitz  # PyMuPDF
-from PIL import Image, ImageEnhance, ImageFilter
-import pytesseract
+import numpy as np
+import ahocorasick
+from PIL import Image, ImageFilter
+import tesserocr
+from dateutil import parser as dparser
 from dotenv import load_dotenv
 from google.oauth2 import service_account
+from google.auth.transport.requests import AuthorizedSession
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.errors import HttpError
 
 from google import genai
 from google.genai import types
@@ -34,17 +56,182 @@ SERVICE_ACCOUNT_FILE = os.getenv("SERVICE_ACCOUNT_FILE", "service_account.json")
 
 RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
 RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST", "irctc-indian-railway-pnr-status.p.rapidapi.com")
+API_DATETIME_FORMAT = "%b %d, %Y %I:%M:%S %p"  # "Feb 13, 2026 4:25:00 PM"
+PNR_API_CONCURRENCY = 8  # max PNR lookups in flight
+
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "cache")
+
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # bytes read per Drive download chunk
+DRIVE_MEDIA_URL = "https://www.googleapis.com/drive/v3/files/{file_id}?alt=media"
+DRIVE_DOWNLOAD_TIMEOUT = (10, 60)  # (connect, read) seconds - a stalled download must not hang the run
+DOWNLOAD_WORKERS = 8  # parallel Drive downloads
+PIPELINE_QUEUE_SIZE = 8  # files downloading or waiting for OCR
+
+PDF_RENDER_DPI = 200
+OCR_UPSCALE = 1.5
 
 SCOPES = [
     "https://www.googleapis.com/auth/drive",
     "https://www.googleapis.com/auth/spreadsheets"
 ]
 
-creds = service_account.Credentials.from_service_account_file(
-    SERVICE_ACCOUNT_FILE, scopes=SCOPES
+
+# Google clients are built on first use so importing this module needs no credentials
+@functools.lru_cache(maxsize=1)
+def _get_creds() -> service_account.Credentials:
+    return service_account.Credentials.from_service_account_file(
+        SERVICE_ACCOUNT_FILE, scopes=SCOPES
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _get_drive():
+    return build("drive", "v3", credentials=_get_creds(),
+                 cache_discovery=False, static_discovery=True)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_sheets():
+    return build("sheets", "v4", credentials=_get_creds(),
+                 cache_discovery=False, static_discovery=True)
+
+
+# Keep-alive authorized pool shared by the parallel Drive downloads
+@functools.lru_cache(maxsize=1)
+def _get_drive_session() -> AuthorizedSession:
+    session = AuthorizedSession(_get_creds())
+    session.mount("https://", HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3, backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            raise_on_status=False
+        )
+    ))
+    return session
+
+
+# Keep-alive connection pool for the PNR API
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3, backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False
+    )
+))
+
+# ================== PATTERNS ==================
+_WS_RE = re.compile(r"\s+")
+_DIGIT_RE = re.compile(r"\d")
+
+# PNR
+_SPACED_PNR_RE = re.compile(r"(?:\d\s+){9}\d")  # "6 5 6 2 5 2 6 4 9 6"
+_PNR_LABEL_RE = re.compile(r"PNR[:=\s]*([A-Z0-9]{6,10})\b", re.IGNORECASE)
+_TRAIN_PNR_RE = re.compile(r"\b\d{10}\b")
+
+# Train passengers
+_IRCTC_PAX_RE = re.compile(  # "1. NAME AGE GENDER | CNF"
+    r"^\d+\.\s+([A-Z!|I][A-Z!\s|I]+?)\s+(\d{1,3})\s+([MFmf|I])\s+[\|\s]*(CNF|WL|RAC|VEG)",
+    re.IGNORECASE
 )
-drive_service = build("drive", "v3", credentials=creds)
-sheets_service = build("sheets", "v4", credentials=creds)
+_IXIGO_PAX_RE = re.compile(  # "1. NAME, AGE, GENDER"
+    r"^\d+\.\s+([A-Z][A-Za-z\s]+?),\s*(\d{1,3})\s*,\s*([MF])\s*$",
+    re.IGNORECASE
+)
+_APP_NAME_RE = re.compile(r"^[A-Z][A-Z\s]{3,40}$")  # "NAME" followed by "Male | AGE yrs"
+_NAME_PART_RE = re.compile(r"[A-Z][a-z]+")
+_OCR_FIX_TABLE = str.maketrans({"!": "I", "|": "I"})  # common OCR misreads of "I"
+
+# Flight
+_FLIGHT_PAX_RES = [
+    re.compile(r"\b(M[rs]s?\.?\s+[A-Z][A-Z\s]+?)\s*\(ADULT\)", re.IGNORECASE),  # Ms NAME (ADULT)
+    re.compile(r"\b(M[rs]\.?\s+[A-Z][a-z]+\s+[A-Z][a-z]+)\b", re.IGNORECASE),   # Mr Firstname Lastname
+]
+_FLIGHT_NUMBER_RES = [
+    re.compile(r"\b(IX|I5|AI|6E|UK|SG|QP)\s*[-\s]*(\d{3,4})\b", re.IGNORECASE),  # Standard
+    re.compile(r"Flight\s+(?:No\.?|Number)?\s*[:=\s]*([A-Z0-9]{2,3}[-\s]?\d{3,4})", re.IGNORECASE),  # "Flight: IX 1234"
+]
+_FLIGHT_PNR_RE = re.compile(r"PNR[:=\s]*([A-Z0-9]{6})\b", re.IGNORECASE)
+_ROUTE_RE = re.compile(r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)\s*[-→–]\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)")
+_DATE_RES = [
+    re.compile(r"\b(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+[,\']?(\d{2,4})\b", re.IGNORECASE),
+    re.compile(r"\b(Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*,?\s+(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+(\d{4})\b", re.IGNORECASE),
+    re.compile(r"\b(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})\b", re.IGNORECASE),
+]
+_TIME_RE = re.compile(r"\b(\d{1,2}:\d{2})\s*(?:hrs|HRS)?\b")
+
+# ================== KEYWORDS ==================
+NON_TICKET_WORDS = ['invoice', 'bill', 'receipt', 'buyer', 'seller', 'gstin', 'tea store']
+TICKET_WORDS = ['pnr', 'train no', 'passenger', 'booking']
+FLIGHT_KEYWORDS = ['indigo', '6e', 'flight', 'terminal', 'check-in', 'boarding pass',
+                   'cleartrip', 'makemytrip', 'booking confirmed']
+TRAIN_KEYWORDS = ['irctc', 'electronic reservation', 'train no', 'coach', 'berth',
+                  'quota', 'vananchal', 'kriya yoga', 'vande bharat', 'booking id : tk',
+                  'pnr :', 'passenger status', 'current status']
+
+# Lines that are never a train passenger name
+PASSENGER_BLOCKLIST = [
+    "CHECK TIMINGS", "PASSENGER DETAILS", "ELECTRONIC RESERVATION",
+    "BOOKED FROM", "BOARDING AT", "TRANSACTION ID", "ACRONYMS",
+    "NAME", "AGE", "GENDER", "BOOKING STATUS", "CURRENT STATUS",
+    "PASSENGER STATUS", "COACH", "SEAT", "BERTH", "CHART NOT PREPARED",
+    "CATERING SERVICE"
+]
+# Common OCR garbage picked up as names
+NAME_BAD_WORDS = ['CONFIRMED', 'AVAILABLE', 'BOOKING', 'STATUS', 'PASSENGER', 'OPTION']
+AIRLINES = {
+    'indigo': 'IndiGo', '6e': 'IndiGo',
+    'air india express': 'Air India Express',
+    'air india': 'Air India',
+    'vistara': 'Vistara',
+    'spicejet': 'SpiceJet'
+}
+FLIGHT_NAME_BAD_WORDS = [
+    'ALLOWED', 'ITEMS', 'BAGGAGE', 'BOOKING', 'DETAILS', 'PAYMENT',
+    'TICKET', 'FLIGHT', 'TERMINAL', 'CHECK', 'INFORMATION', 'IMPORTANT',
+    'CONTACT', 'CUSTOMER', 'SUPPORT', 'YATRA', 'DIGI', 'AVOID'
+]
+
+
+def _build_automaton(words: List[str]) -> ahocorasick.Automaton:
+    """Aho-Corasick automaton matching any of the words as substrings"""
+    ac = ahocorasick.Automaton()
+    for word in words:
+        ac.add_word(word, word)
+    ac.make_automaton()
+    return ac
+
+
+def _build_tagged_automaton(groups: Dict[str, List[str]]) -> ahocorasick.Automaton:
+    """Aho-Corasick automaton over several word lists; values are (tag, word)"""
+    ac = ahocorasick.Automaton()
+    for tag, words in groups.items():
+        for word in words:
+            ac.add_word(word, (tag, word))
+    ac.make_automaton()
+    return ac
+
+
+def _ac_any(ac: ahocorasick.Automaton, text: str) -> bool:
+    """True if any keyword occurs in text (single pass, stops at first hit)"""
+    return next(ac.iter(text), None) is not None
+
+
+_NON_TICKET_AC = _build_automaton(NON_TICKET_WORDS)
+_TICKET_KW_AC = _build_automaton(TICKET_WORDS)
+_AIRLINE_AC = ahocorasick.Automaton()  # value: (priority, airline) - AIRLINES order
+for _priority, (_key, _airline) in enumerate(AIRLINES.items()):
+    _AIRLINE_AC.add_word(_key, (_priority, _airline))
+_AIRLINE_AC.make_automaton()
+
+_TICKET_TYPE_AC = _build_tagged_automaton({"FLIGHT": FLIGHT_KEYWORDS, "TRAIN": TRAIN_KEYWORDS})
+_BLOCKLIST_AC = _build_automaton(PASSENGER_BLOCKLIST)
+_BAD_WORDS_AC = _build_automaton(NAME_BAD_WORDS)
+_FLIGHT_BAD_WORDS_AC = _build_automaton(FLIGHT_NAME_BAD_WORDS)
 
 
 def is_bad_ocr(text: str) -> bool:
@@ -61,6 +248,33 @@ def is_bad_ocr(text: str) -> bool:
     return False
 
 
+# One PyTessBaseAPI per OCR thread (the C++ API isn't thread-safe)
+_tesseract_local = threading.local()
+
+
+def _render_page(file_bytes: bytes, page_no: int) -> Tuple[int, int, bytes]:
+    """Render one PDF page to grayscale (runs in a worker process)"""
+    with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+        return _pixmap_gray(doc[page_no])
+
+
+def _pixmap_gray(page: fitz.Page) -> Tuple[int, int, bytes]:
+    pix = page.get_pixmap(dpi=PDF_RENDER_DPI, colorspace=fitz.csGRAY)
+    return pix.width, pix.height, pix.samples
+
+
+def _execute_with_retry(request, max_attempts: int = 6, retry_statuses: Tuple[int, ...] = (429, 503)):
+    """Execute a Google API request with exponential backoff on retry_statuses"""
+    for attempt in range(max_attempts):
+        try:
+            return request.execute()
+        except HttpError as e:
+            if e.resp.status not in retry_statuses or attempt == max_attempts - 1:
+                raise
+            delay = min(64, 2 ** attempt) + random.random()
+            print(f"⏳ Google API {e.resp.status}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
 
 class GeminiOCR:
     """Gemini Vision OCR fallback"""
@@ -113,21 +327,47 @@ class GeminiOCR:
 
 class PNRExtractor:
     """Extract PNR and passenger info from tickets"""
+
+    _render_pool = None  # singleton
+    _ocr_pool = None  # singleton - long-lived threads keep their tesseract instances
+
+    @staticmethod
+    def _get_render_pool() -> ProcessPoolExecutor:
+        if PNRExtractor._render_pool is None:
+            # Created mid-run while download/OCR threads are live - forking a
+            # multi-threaded process can deadlock the child, so use a forkserver
+            PNRExtractor._render_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+        return PNRExtractor._render_pool
+
+    @staticmethod
+    def _get_ocr_pool() -> ThreadPoolExecutor:
+        if PNRExtractor._ocr_pool is None:
+            PNRExtractor._ocr_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+        return PNRExtractor._ocr_pool
     
     @staticmethod
-    def file_to_images(file_bytes: bytes, mime_type: str, filename: str) -> List[Image.Image]:
-        """Convert PDF/image to PIL images"""
+    def file_to_images(file_buf: io.BytesIO, mime_type: str, filename: str) -> List[Image.Image]:
+        """Convert PDF/image to PIL images (PDF pages rendered in parallel, grayscale)"""
         images = []
         if 'pdf' in mime_type.lower() or filename.lower().endswith('.pdf'):
-            doc = fitz.open(stream=file_bytes, filetype="pdf")
-            for page in doc:
-                pix = page.get_pixmap(dpi=300)
-                png_bytes = pix.tobytes("png")
-                img = Image.open(io.BytesIO(png_bytes)).convert("RGB")
-                images.append(img)
-            doc.close()
+            with fitz.open(stream=file_buf, filetype="pdf") as doc:
+                page_count = doc.page_count
+                if page_count <= 1:
+                    pages = [_pixmap_gray(page) for page in doc]
+
+            # fitz.Document isn't picklable - each worker reopens it from the bytes
+            if page_count > 1:
+                pool = PNRExtractor._get_render_pool()
+                file_bytes = file_buf.getvalue()
+                pages = pool.map(_render_page, [file_bytes] * page_count, range(page_count))
+
+            for width, height, samples in pages:
+                images.append(Image.frombytes("L", (width, height), samples))
         else:
-            img = Image.open(io.BytesIO(file_bytes)).convert("RGB")
+            img = Image.open(file_buf).convert("RGB")
             images.append(img)
         return images
     
@@ -135,41 +375,50 @@ class PNRExtractor:
     def ocr_images_full(images: List[Image.Image], force_gemini: bool = False) -> str:
 
     # def ocr_images_full(images: List[Image.Image]) -> str:
-        """Full OCR with enhanced quality - IMPROVED VERSION"""
-        texts = []
-        for idx, img in enumerate(images):
-            # Try multiple OCR strategies
-            strategies = [
-                ("Standard", img, "--psm 6"),
-                ("High contrast", PNRExtractor._enhance_image(img, contrast=3.0), "--psm 6"),
-                ("Auto", img, "--psm 3"),
-            ]
-            
-            best_text = ""
-            for strategy_name, processed_img, psm in strategies:
+        """Full OCR - pages run in parallel on per-thread tesseract instances"""
+        if not images:
+            return ""
+
+        def _ocr_page(idx: int, img: Image.Image) -> Tuple[str, List[str]]:
+            messages = []
+            try:
+                text = PNRExtractor._tesseract(PNRExtractor._preprocess_for_ocr(img))
+            except Exception as e:
+                text = ""
+                messages.append(f"✗ Tesseract OCR failed: {e}")
+
+            # ---------- HIGH CONTRAST FALLBACK ----------
+            if len(text.strip()) < 50:
                 try:
-                    gray = processed_img.convert("L")
-                    gray = gray.resize((gray.width * 3, gray.height * 3), Image.LANCZOS)
-                    
-                    text = pytesseract.image_to_string(
-                        gray, lang="eng",
-                        config=f"{psm} -c preserve_interword_spaces=1"
+                    gray = np.asarray(img if img.mode == "L" else img.convert("L"))
+                    enhanced = PNRExtractor._enhance_image(gray, contrast=3.0)
+                    enhanced = cv2.resize(
+                        enhanced, None, fx=OCR_UPSCALE, fy=OCR_UPSCALE, interpolation=cv2.INTER_CUBIC
                     )
-                    
-                    # Use the longest/best result
-                    if len(text) > len(best_text):
-                        best_text = text
-                except:
-                    continue
-            
+                    retry = PNRExtractor._tesseract(Image.fromarray(enhanced))
+                    if len(retry) > len(text):
+                        text = retry
+                except Exception:
+                    pass
+
+            if not (force_gemini or is_bad_ocr(text)):
+                return text, messages
 
             # ---------- GEMINI FALLBACK ----------
-            if force_gemini or is_bad_ocr(best_text):
-                print(f"⚠️ Using Gemini Vision OCR on page {idx+1}")
-                try:
-                    best_text = GeminiOCR.image_to_text(img)
-                except Exception as e:
-                    print(f"✗ Gemini OCR failed: {e}")
+            messages.append(f"⚠️ Using Gemini Vision OCR on page {idx+1}")
+            try:
+                text = GeminiOCR.image_to_text(img)
+            except Exception as e:
+                messages.append(f"✗ Gemini OCR failed: {e}")
+            return text, messages
+
+        pool = PNRExtractor._get_ocr_pool()
+        results = list(pool.map(_ocr_page, range(len(images)), images))
+
+        texts = []
+        for idx, (best_text, messages) in enumerate(results):
+            for message in messages:
+                print(message)
 
             print(f"\n{'='*30}\nOCR OUTPUT — PAGE {idx + 1}\n{'='*30}")
             print(best_text[:500] + "..." if len(best_text) > 500 else best_text)
@@ -177,15 +426,36 @@ class PNRExtractor:
 
             texts.append(best_text)
         return "\n".join(texts)
+
+    @staticmethod
+    def _preprocess_for_ocr(img: Image.Image) -> Image.Image:
+        """Grayscale, 1.5x upscale and adaptive threshold"""
+        gray = np.asarray(img if img.mode == "L" else img.convert("L"))
+        gray = cv2.resize(gray, None, fx=OCR_UPSCALE, fy=OCR_UPSCALE, interpolation=cv2.INTER_CUBIC)
+        binary = cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10
+        )
+        return Image.fromarray(binary)
+
+    @staticmethod
+    def _tesseract(img: Image.Image) -> str:
+        """OCR one image on this thread's tesseract instance (model stays loaded)"""
+        api = getattr(_tesseract_local, "api", None)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang="eng", psm=tesserocr.PSM.SINGLE_BLOCK)
+            api.SetVariable("preserve_interword_spaces", "1")
+            _tesseract_local.api = api
+        api.SetImage(img)
+        return api.GetUTF8Text()
     
     @staticmethod
-    def _enhance_image(img: Image.Image, contrast: float = 2.5) -> Image.Image:
-        """Enhance image quality"""
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(contrast)
-        enhancer = ImageEnhance.Sharpness(img)
-        img = enhancer.enhance(2.0)
-        return img
+    def _enhance_image(gray: np.ndarray, contrast: float = 2.5) -> np.ndarray:
+        """Enhance image quality (contrast around the mean + unsharp mask)"""
+        # Same curves as PIL's ImageEnhance.Contrast / Sharpness(2.0), on OpenCV's SIMD paths
+        mean = float(gray.mean())
+        gray = cv2.addWeighted(gray, contrast, gray, 0, (1 - contrast) * mean)
+        blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+        return cv2.addWeighted(gray, 2.0, blurred, -1.0, 0)
     
     @staticmethod
     def detect_ticket_type(text: str) -> str:
@@ -193,21 +463,15 @@ class PNRExtractor:
         t = text.lower()
         
         # Check for non-ticket content
-        non_ticket_words = ['invoice', 'bill', 'receipt', 'buyer', 'seller', 'gstin', 'tea store']
-        if any(word in t for word in non_ticket_words):
+        if _ac_any(_NON_TICKET_AC, t):
             # Check if it has ticket keywords
-            ticket_words = ['pnr', 'train no', 'passenger', 'booking']
-            if not any(word in t for word in ticket_words):
+            if not _ac_any(_TICKET_KW_AC, t):
                 return "UNKNOWN"
         
-        flight_kw = ['indigo', '6e', 'flight', 'terminal', 'check-in', 'boarding pass', 
-                     'cleartrip', 'makemytrip', 'booking confirmed']
-        train_kw = ['irctc', 'electronic reservation', 'train no', 'coach', 'berth',
-                    'quota', 'vananchal', 'kriya yoga', 'vande bharat', 'booking id : tk', 
-                    'pnr :', 'passenger status', 'current status']
-        
-        flight_score = sum(1 for kw in flight_kw if kw in t)
-        train_score = sum(1 for kw in train_kw if kw in t)
+        # One pass over the text scores both ticket types
+        hits = {value for _, value in _TICKET_TYPE_AC.iter(t)}
+        flight_score = sum(1 for tag, _ in hits if tag == "FLIGHT")
+        train_score = len(hits) - flight_score
         
         print(f"🔍 Detection: Flight={flight_score}, Train={train_score}")
         
@@ -226,9 +490,9 @@ class PNRExtractor:
 
         def extract_spaced_pnr(text):
             # Example: "6 5 6 2 5 2 6 4 9 6"
-            spaced = re.findall(r'(?:\d\s+){9}\d', text)
+            spaced = _SPACED_PNR_RE.findall(text)
             for s in spaced:
-                pnr = re.sub(r'\s+', '', s)
+                pnr = _WS_RE.sub('', s)
                 if len(pnr) == 10:
                     return pnr
             return None
@@ -236,12 +500,12 @@ class PNRExtractor:
         if pnr:
             return pnr
 
-        m = re.search(r"PNR[:=\s]*([A-Z0-9]{6,10})\b", text, re.IGNORECASE)
+        m = _PNR_LABEL_RE.search(text)
         if m:
             return m.group(1).upper()
         
         # 10-digit train PNR
-        candidates = re.findall(r"\b\d{10}\b", text)
+        candidates = _TRAIN_PNR_RE.findall(text)
         candidates = [c for c in candidates if not c.startswith(("201", "202", "203", "982", "100"))]
         if candidates:
             return candidates[0]
@@ -252,81 +516,66 @@ class PNRExtractor:
     def extract_train_passengers(text: str) -> List[str]:
         """Extract passenger names from train tickets (ALL FORMATS) - IMPROVED"""
         names = []
+        _seen_names = set()  # upper-cased names already in `names`
         
-        BLOCKLIST = {
-            "CHECK TIMINGS", "PASSENGER DETAILS", "ELECTRONIC RESERVATION",
-            "BOOKED FROM", "BOARDING AT", "TRANSACTION ID", "ACRONYMS",
-            "NAME", "AGE", "GENDER", "BOOKING STATUS", "CURRENT STATUS",
-            "PASSENGER STATUS", "COACH", "SEAT", "BERTH", "CHART NOT PREPARED",
-            "CATERING SERVICE"
-        }
-        
-        lines = [re.sub(r"\s+", " ", l.strip()) for l in text.splitlines() if l.strip()]
+        lines = [_WS_RE.sub(" ", l.strip()) for l in text.splitlines() if l.strip()]
         
         for line in lines:
-            # Skip blocklist
-            if any(b in line.upper() for b in BLOCKLIST):
-                continue
             if len(line) < 4:  # Changed from 10 to catch short names like "SONAL"
                 continue
-            
-            # Pattern 1: IRCTC format "1. NAME AGE GENDER | CNF"
-            m = re.search(
-                r"^\d+\.\s+([A-Z!|I][A-Z!\s|I]+?)\s+(\d{1,3})\s+([MFmf|I])\s+[\|\s]*(CNF|WL|RAC|VEG)",
-                line, re.IGNORECASE
-            )
-            if m:
-                raw_name = PNRExtractor._clean_ocr_name(m.group(1))
-                if raw_name and raw_name not in names:
-                    names.append(raw_name)
-                    print(f"  → Train passenger (IRCTC): {raw_name}")
+            # Skip blocklist
+            upper = line.upper()
+            if _ac_any(_BLOCKLIST_AC, upper):
                 continue
             
-            # Pattern 2: ixigo format "1. NAME, AGE, GENDER"
-            m2 = re.search(
-                r"^\d+\.\s+([A-Z][A-Za-z\s]+?),\s*(\d{1,3})\s*,\s*([MF])\s*$",
-                line, re.IGNORECASE
-            )
-            if m2:
-                raw_name = PNRExtractor._clean_ocr_name(m2.group(1))
-                if raw_name and raw_name not in names:
-                    names.append(raw_name)
-                    print(f"  → Train passenger (ixigo): {raw_name}")
-                continue
+            # Dispatch on the first character - each format can only match one branch
+            first = line[0]
+            if first.isdigit():
+                # Pattern 1: IRCTC format "1. NAME AGE GENDER | CNF"
+                # Pattern 2: ixigo format "1. NAME, AGE, GENDER"
+                source = "IRCTC"
+                m = _IRCTC_PAX_RE.match(line)
+                if not m:
+                    source = "ixigo"
+                    m = _IXIGO_PAX_RE.match(line)
+                if m:
+                    raw_name = PNRExtractor._clean_ocr_name(m.group(1))
+                    if raw_name and raw_name.upper() not in _seen_names:
+                        _seen_names.add(raw_name.upper())
+                        names.append(raw_name)
+                        print(f"  → Train passenger ({source}): {raw_name}")
             
             # Pattern 3: App screenshot format "NAME" followed by "Male | AGE yrs"
-            if re.match(r'^[A-Z][A-Z\s]{3,40}$', line):  # Changed from 5 to 3 to catch "SONAL"
+            elif first.isupper() and _APP_NAME_RE.match(line):  # Changed from 5 to 3 to catch "SONAL"
                 # Check if it's a proper name
                 words = line.split()
                 # Accept single names or multi-word names
                 if len(words) >= 1 and all(len(w) >= 2 for w in words):  # Changed from >= 2 to >= 1
                     raw_name = PNRExtractor._clean_ocr_name(line)
-                    if raw_name and raw_name not in names:
+                    if raw_name and raw_name.upper() not in _seen_names:
+                        _seen_names.add(raw_name.upper())
                         names.append(raw_name)
                         print(f"  → Train passenger (App): {raw_name}")
-                        continue
         
         return names
     
     @staticmethod
     def _clean_ocr_name(raw_name: str) -> str:
         """Clean OCR artifacts from name"""
-        name = raw_name.strip()
-        name = name.replace("!", "I").replace("|", "I")
-        name = re.sub(r'\s+', ' ', name)
+        # "!"/"|" → "I" and whitespace collapse, without the regex engine
+        name = " ".join(raw_name.translate(_OCR_FIX_TABLE).split())
         
         # Skip if contains numbers or too short
-        if re.search(r'\d', name) or len(name) < 3:  # Changed from < 3 to accept short names
+        if _DIGIT_RE.search(name) or len(name) < 3:  # Changed from < 3 to accept short names
             return ""
         
         # Skip common OCR garbage
-        BAD_WORDS = ['CONFIRMED', 'AVAILABLE', 'BOOKING', 'STATUS', 'PASSENGER', 'OPTION']
-        if any(bad in name.upper() for bad in BAD_WORDS):
+        if _ac_any(_BAD_WORDS_AC, name.upper()):
             return ""
         
         # Fix concatenated: "ANILSANTHALIA" → "Anil Santhalia"
         if " " not in name and len(name) > 8:
-            parts = re.findall(r'[A-Z][a-z]+', name)
+            parts = _NAME_PART_RE.findall(name)
             name = " ".join(parts) if len(parts) >= 2 else name.title()
         else:
             name = name.title()
@@ -337,23 +586,20 @@ class PNRExtractor:
     def extract_flight_passengers(text: str) -> List[Dict]:
         """Extract flight passengers with validation"""
         passengers = []
+        _seen_flight_names = set()  # upper-cased names already in `passengers`
         
         # Stricter patterns
-        patterns = [
-            r"\b(M[rs]s?\.?\s+[A-Z][A-Z\s]+?)\s*\(ADULT\)",  # Ms NAME (ADULT)
-            r"\b(M[rs]\.?\s+[A-Z][a-z]+\s+[A-Z][a-z]+)\b",   # Mr Firstname Lastname
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern in _FLIGHT_PAX_RES:
+            matches = pattern.findall(text)
             for match in matches:
-                name = re.sub(r'\s+', ' ', match.strip())
+                name = _WS_RE.sub(' ', match.strip())
                 name = name.replace("Mr.", "Mr").replace("Ms.", "Ms").replace("Mrs.", "Mrs")
                 
                 # Validation: reject garbage
                 if PNRExtractor._is_valid_flight_name(name):
                     # Check if already added
-                    if not any(p['name'].upper() == name.upper() for p in passengers):
+                    if name.upper() not in _seen_flight_names:
+                        _seen_flight_names.add(name.upper())
                         passengers.append({'name': name, 'seat': ''})
                         print(f"  → Flight passenger: {name}")
         
@@ -365,13 +611,7 @@ class PNRExtractor:
         name_upper = name.upper()
         
         # Reject common garbage
-        BAD_WORDS = [
-            'ALLOWED', 'ITEMS', 'BAGGAGE', 'BOOKING', 'DETAILS', 'PAYMENT',
-            'TICKET', 'FLIGHT', 'TERMINAL', 'CHECK', 'INFORMATION', 'IMPORTANT',
-            'CONTACT', 'CUSTOMER', 'SUPPORT', 'YATRA', 'DIGI', 'AVOID'
-        ]
-        
-        if any(bad in name_upper for bad in BAD_WORDS):
+        if _ac_any(_FLIGHT_BAD_WORDS_AC, name_upper):
             return False
         
         # Must have at least one space (first + last name)
@@ -383,7 +623,7 @@ class PNRExtractor:
             return False
         
         # Must not have numbers
-        if re.search(r'\d', name):
+        if _DIGIT_RE.search(name):
             return False
         
         return True
@@ -406,33 +646,22 @@ class FlightExtractor:
             'passengers': []
         }
         
-        # Airline
-        airlines = {
-            'indigo': 'IndiGo', '6e': 'IndiGo',
-            'air india express': 'Air India Express',
-            'air india': 'Air India',
-            'vistara': 'Vistara',
-            'spicejet': 'SpiceJet'
-        }
-        
+        # Airline - earliest AIRLINES entry found anywhere in the text wins
+        # ("air india express" is listed before "air india")
         t_lower = text.lower()
-        for key, airline in airlines.items():
-            if key in t_lower:
+        best_priority = len(AIRLINES)
+        for _, (priority, airline) in _AIRLINE_AC.iter(t_lower):
+            if priority < best_priority:
+                best_priority = priority
                 result['airline'] = airline
-                break
         
         # Flight number
-        patterns = [
-            r'\b(IX|I5|AI|6E|UK|SG|QP)\s*[-\s]*(\d{3,4})\b',  # Standard
-            r'Flight\s+(?:No\.?|Number)?\s*[:=\s]*([A-Z0-9]{2,3}[-\s]?\d{3,4})',  # "Flight: IX 1234"
-        ]
-        
-        for pattern in patterns:
-            m = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _FLIGHT_NUMBER_RES:
+            m = pattern.search(text)
             if len(m.groups()) == 2:
                 result['flight_number'] = f"{m.group(1)} {m.group(2)}"
             else:
-                result['flight_number'] = re.sub(r'\s+', ' ', m.group(1))
+                result['flight_number'] = _WS_RE.sub(' ', m.group(1))
             break
         
 
@@ -441,29 +670,24 @@ class FlightExtractor:
         #     result['flight_number'] = f"{m.group(1)} {m.group(2)}"
         
         # PNR
-        m = re.search(r'PNR[:=\s]*([A-Z0-9]{6})\b', text, re.IGNORECASE)
+        m = _FLIGHT_PNR_RE.search(text)
         if m:
             result['pnr'] = m.group(1).upper()
         
         # Route
-        m = re.search(r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)\s*[-→–]\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)', text)
+        m = _ROUTE_RE.search(text)
         if m:
             result['route'] = f"{m.group(1)} → {m.group(2)}"
         
         # Date
-        date_patterns = [
-            r'\b(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+[,\']?(\d{2,4})\b',
-            r'\b(Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*,?\s+(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+(\d{4})\b',
-            r'\b(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})\b'
-        ]
-        for pattern in date_patterns:
-            m = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _DATE_RES:
+            m = pattern.search(text)
             if m:
                 result['date'] = m.group(0)
                 break
         
         # Times
-        times = re.findall(r'\b(\d{1,2}:\d{2})\s*(?:hrs|HRS)?\b', text)
+        times = _TIME_RE.findall(text)
         if len(times) >= 2:
             result['departure_time'] = times[0]
             result['arrival_time'] = times[1]
@@ -480,16 +704,22 @@ class TrainPNRAPI:
     """Train PNR API integration"""
     
     @staticmethod
-    def check_train_pnr(pnr: str) -> Optional[Dict]:
-        """Check train PNR via API"""
+    def _pnr_request(pnr: str) -> Tuple[str, Dict]:
+        """URL and headers for a PNR status lookup"""
         url = f"https://{RAPIDAPI_HOST}/getPNRStatus/{pnr}"
         headers = {
             "x-rapidapi-key": RAPIDAPI_KEY,
             "x-rapidapi-host": RAPIDAPI_HOST
         }
+        return url, headers
+    
+    @staticmethod
+    def check_train_pnr(pnr: str) -> Optional[Dict]:
+        """Check train PNR via API"""
+        url, headers = TrainPNRAPI._pnr_request(pnr)
         
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = _session.get(url, headers=headers, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 print(f"✓ API fetched PNR {pnr}")
@@ -501,6 +731,59 @@ class TrainPNRAPI:
             print(f"✗ API exception: {e}")
             return None
     
+    @staticmethod
+    async def check_train_pnr_async(pnr: str, client: httpx.AsyncClient,
+                                    semaphore: asyncio.Semaphore) -> Optional[Dict]:
+        """Check train PNR via API (async, bounded by semaphore)"""
+        url, headers = TrainPNRAPI._pnr_request(pnr)
+        
+        async with semaphore:
+            try:
+                response = await client.get(url, headers=headers, timeout=10)
+                if response.status_code == 200:
+                    data = response.json()
+                    print(f"✓ API fetched PNR {pnr}")
+                    return data
+                else:
+                    print(f"✗ API error {response.status_code} for PNR {pnr}")
+                    return None
+            except Exception as e:
+                print(f"✗ API exception for PNR {pnr}: {e}")
+                return None
+    
+    @staticmethod
+    def check_train_pnrs(pnrs: List[str]) -> Dict[str, Optional[Dict]]:
+        """Check many PNRs concurrently (at most PNR_API_CONCURRENCY in flight)"""
+        unique_pnrs = list(dict.fromkeys(pnrs))
+        if not unique_pnrs:
+            return {}
+        
+        async def _check_all():
+            semaphore = asyncio.Semaphore(PNR_API_CONCURRENCY)
+            async with httpx.AsyncClient() as client:
+                return await asyncio.gather(
+                    *[TrainPNRAPI.check_train_pnr_async(pnr, client, semaphore) for pnr in unique_pnrs],
+                    return_exceptions=True
+                )
+        
+        results = asyncio.run(_check_all())
+        return {
+            pnr: None if isinstance(result, BaseException) else result
+            for pnr, result in zip(unique_pnrs, results)
+        }
+    
+    @staticmethod
+    def _parse_api_datetime(value: str) -> Optional[datetime]:
+        """Parse API timestamp - fixed format first, dateutil as fallback"""
+        try:
+            return datetime.strptime(value, API_DATETIME_FORMAT)
+        except ValueError:
+            pass
+        try:
+            return dparser.parse(value)
+        except (ValueError, OverflowError):
+            return None
+    
     @staticmethod
     def parse_train_response(response: Dict, passenger_names: List[str] = None) -> Dict:
         """Parse train API response with separate time columns"""
@@ -532,44 +815,21 @@ class TrainPNRAPI:
             
             # Parse journey date and time
             if journey_date_str:
-                try:
-                    from dateutil import parser as dparser
-                    dt = dparser.parse(journey_date_str)
+                dt = TrainPNRAPI._parse_api_datetime(journey_date_str)
+                if dt:
                     journey_date = dt.strftime("%Y-%m-%d")
                     departure_time = dt.strftime("%H:%M")
-                except:
+                else:
                     journey_date = journey_date_str
-                    # Try to extract time manually
-                    time_match = re.search(r'(\d{1,2}):(\d{2})(?::(\d{2}))?\s*(AM|PM)?', journey_date_str)
-                    if time_match:
-                        hour = int(time_match.group(1))
-                        minute = time_match.group(2)
-                        ampm = time_match.group(4)
-                        if ampm == 'PM' and hour != 12:
-                            hour += 12
-                        elif ampm == 'AM' and hour == 12:
-                            hour = 0
-                        departure_time = f"{hour:02d}:{minute}"
             
             # Parse arrival date and time
             if arrival_date_str:
-                try:
-                    from dateutil import parser as dparser
-                    dt = dparser.parse(arrival_date_str)
+                dt = TrainPNRAPI._parse_api_datetime(arrival_date_str)
+                if dt:
                     arrival_date = dt.strftime("%Y-%m-%d")
                     arrival_time = dt.strftime("%H:%M")
-                except:
+                else:
                     arrival_date = arrival_date_str
-                    time_match = re.search(r'(\d{1,2}):(\d{2})(?::(\d{2}))?\s*(AM|PM)?', arrival_date_str)
-                    if time_match:
-                        hour = int(time_match.group(1))
-                        minute = time_match.group(2)
-                        ampm = time_match.group(4)
-                        if ampm == 'PM' and hour != 12:
-                            hour += 12
-                        elif ampm == 'AM' and hour == 12:
-                            hour = 0
-                        arrival_time = f"{hour:02d}:{minute}"
             
             # Passengers
             passengers = []
@@ -609,6 +869,48 @@ class TrainPNRAPI:
             return {'pnr': 'UNKNOWN', 'mode': 'TRAIN', 'error': str(e), 'passengers': []}
 
 
+class OCRCache:
+    """OCR results cached on disk, keyed on file content hash"""
+
+    @staticmethod
+    def key(file_buf: io.BytesIO) -> str:
+        """Content hash of the ticket file"""
+        with file_buf.getbuffer() as view:
+            return hashlib.blake2b(view, digest_size=16).hexdigest()
+
+    @staticmethod
+    def _path(key: str) -> str:
+        return os.path.join(OCR_CACHE_DIR, f"{key}.json")
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _load(key: str) -> Dict:
+        # Misses raise, so only hits are memoised
+        with open(OCRCache._path(key), encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def get(key: str) -> Optional[Dict]:
+        """Cached {text, ticket_type, pnr} or None"""
+        try:
+            return OCRCache._load(key)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def put(key: str, text: str, ticket_type: str, pnr: str):
+        """Store a successful OCR result"""
+        entry = {"text": text, "ticket_type": ticket_type, "pnr": pnr}
+        try:
+            os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+            tmp_path = OCRCache._path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, OCRCache._path(key))
+        except OSError as e:
+            print(f"⚠ OCR cache write failed: {e}")
+
+
 class TicketProcessor:
     """Main ticket processor"""
     
@@ -616,6 +918,7 @@ class TicketProcessor:
         self.pnr_extractor = PNRExtractor()
         self.train_api = TrainPNRAPI()
         self.flight_extractor = FlightExtractor()
+        self.pnr_responses: Dict[str, Dict] = {}  # prefetched API responses by PNR
     
     def _process_by_type(self, ticket_type: str, text: str, filename: str) -> Dict:
         """
@@ -633,28 +936,90 @@ class TicketProcessor:
             }
 
 
-    def process_ticket(self, file_bytes: bytes, filename: str, mime_type: str) -> Dict:
+    def process_ticket(self, file_buf: io.BytesIO, filename: str, mime_type: str) -> Dict:
         """Process ticket file"""
+        return self.finish_ticket(self.ocr_ticket(file_buf, filename, mime_type))
+    
+    def ocr_ticket(self, file_buf: io.BytesIO, filename: str, mime_type: str,
+                   reload: Optional[Callable[[], io.BytesIO]] = None) -> Dict:
+        """OCR a ticket file and detect its type (no API calls).
+        With reload, the file is fetched again for the Gemini retry instead of being kept."""
         print(f"\n{'='*70}\nProcessing: {filename}\n{'='*70}")
         
+        # Page bitmaps are dropped after OCR; the file itself only when it can be reloaded
+        ticket = {'filename': filename, 'file_buf': None if reload else file_buf, 'reload': reload,
+                  'mime_type': mime_type, 'cached': False, 'error': None}
         try:
-            images = self.pnr_extractor.file_to_images(file_bytes, mime_type, filename)
+            # ---------- OCR CACHE ----------
+            ticket['cache_key'] = OCRCache.key(file_buf)
+            cached = OCRCache.get(ticket['cache_key'])
+            if cached:
+                print(f"✓ OCR cache hit ({cached['ticket_type']}, PNR {cached['pnr'] or '-'})")
+                # No Gemini retry for cached text - the file is not needed again
+                ticket.update(text=cached["text"], ticket_type=cached["ticket_type"], cached=True, file_buf=None)
+                return ticket
+
+            images = self.pnr_extractor.file_to_images(file_buf, mime_type, filename)
             print(f"✓ Converted to {len(images)} image(s)")
 
             # ---------- FIRST PASS ----------
             full_text = self.pnr_extractor.ocr_images_full(images)
-            ticket_type = self.pnr_extractor.detect_ticket_type(full_text)
+            ticket.update(
+                text=full_text,
+                ticket_type=self.pnr_extractor.detect_ticket_type(full_text)
+            )
+
+        except Exception as e:
+            ticket['error'] = f'Processing failed: {str(e)}'
+        
+        return ticket
+    
+    def prefetch_train_pnrs(self, tickets: List[Dict]):
+        """Look up the PNRs of all OCR'd train tickets concurrently"""
+        pnrs = []
+        for ticket in tickets:
+            if not ticket['error'] and ticket['ticket_type'] == "TRAIN":
+                pnr = self.pnr_extractor.extract_pnr_from_text(ticket['text'])
+                if pnr:
+                    pnrs.append(pnr)
+        
+        if not pnrs:
+            return
+        
+        print(f"\n🚂 Checking {len(pnrs)} PNR(s) concurrently")
+        responses = self.train_api.check_train_pnrs(pnrs)
+        # Failed lookups are left out so process_train retries them
+        self.pnr_responses.update({pnr: data for pnr, data in responses.items() if data})
+    
+    def finish_ticket(self, ticket: Dict) -> Dict:
+        """Extract ticket details from OCR output (API lookup + Gemini retry)"""
+        filename = ticket['filename']
+        print(f"\n📄 {filename}")
+        if ticket['error']:
+            return {'error': ticket['error'], 'filename': filename, 'mode': 'ERROR'}
+        
+        try:
+            full_text = ticket['text']
+            ticket_type = ticket['ticket_type']
             result = self._process_by_type(ticket_type, full_text, filename)
+            if ticket['cached']:
+                return result
 
             # ---------- FALLBACK PASS ----------
             if result.get("error"):
                 print("🔁 Retrying extraction after Gemini OCR")
+                file_buf = ticket['reload']() if ticket['reload'] else ticket['file_buf']
+                file_buf.seek(0)
+                images = self.pnr_extractor.file_to_images(file_buf, ticket['mime_type'], filename)
                 full_text = self.pnr_extractor.ocr_images_full(images, force_gemini=True)
 
                 # full_text = self.pnr_extractor.ocr_images_full(images)
                 ticket_type = self.pnr_extractor.detect_ticket_type(full_text)
                 result = self._process_by_type(ticket_type, full_text, filename)
 
+            if not result.get("error"):
+                OCRCache.put(ticket['cache_key'], full_text, ticket_type, result.get("pnr", ""))
+
             return result
 
         except Exception as e:
@@ -664,8 +1029,6 @@ class TicketProcessor:
                 'mode': 'ERROR'
             }
     
-
-    
     def process_flight(self, text: str, filename: str) -> Dict:
         """Process flight ticket"""
         print("\n✈️ Processing FLIGHT...")
@@ -709,8 +1072,8 @@ class TicketProcessor:
         
         print(f"✓ PNR: {pnr}")
         
-        # API call
-        api_response = self.train_api.check_train_pnr(pnr)
+        # API call (unless already fetched by prefetch_train_pnrs)
+        api_response = self.pnr_responses.get(pnr) or self.train_api.check_train_pnr(pnr)
         if not api_response:
             return {
                 'error': f'API failed for PNR {pnr}',
@@ -733,24 +1096,33 @@ class GoogleSheetsManager:
     """Sheet management with error rows"""
     
     @staticmethod
-    def append_ticket_data(ticket_data: Dict) -> bool:
-        """Append to sheet (including error rows)"""
+    def append_ticket_data(tickets: List[Dict]) -> bool:
+        """Append rows for every ticket (including error rows) in a single request"""
+        rows = []
+        for ticket_data in tickets:
+            rows.extend(GoogleSheetsManager._ticket_rows(ticket_data))
+        
+        return GoogleSheetsManager._append_rows(rows)
+    
+    @staticmethod
+    def _ticket_rows(ticket_data: Dict) -> List[List]:
+        """Sheet rows for one ticket"""
         if ticket_data.get('error'):
             # Add error row
-            return GoogleSheetsManager._append_error_row(ticket_data)
+            return GoogleSheetsManager._error_rows(ticket_data)
         
         mode = ticket_data.get('mode')
         
         if mode == 'TRAIN':
-            return GoogleSheetsManager._append_train(ticket_data)
+            return GoogleSheetsManager._train_rows(ticket_data)
         elif mode == 'FLIGHT':
-            return GoogleSheetsManager._append_flight(ticket_data)
+            return GoogleSheetsManager._flight_rows(ticket_data)
         
-        return False
+        return []
     
     @staticmethod
-    def _append_error_row(ticket_data: Dict) -> bool:
-        """Append error row to sheet"""
+    def _error_rows(ticket_data: Dict) -> List[List]:
+        """Error row for the sheet"""
         error_msg = ticket_data.get('error', 'Unknown error')
         filename = ticket_data.get('filename', 'Unknown file')
         pnr = ticket_data.get('pnr', '')
@@ -774,14 +1146,14 @@ class GoogleSheetsManager:
             filename  # M: Source
         ]
         
-        return GoogleSheetsManager._append_rows([row])
+        return [row]
     
     @staticmethod
-    def _append_train(ticket_data: Dict) -> bool:
-        """Append train data with separate time columns"""
+    def _train_rows(ticket_data: Dict) -> List[List]:
+        """Train rows with separate time columns"""
         passengers = ticket_data.get('passengers', [])
         if not passengers:
-            return False
+            return []
         
         rows = []
         for pax in passengers:
@@ -803,14 +1175,14 @@ class GoogleSheetsManager:
             ]
             rows.append(row)
         
-        return GoogleSheetsManager._append_rows(rows)
+        return rows
     
     @staticmethod
-    def _append_flight(ticket_data: Dict) -> bool:
-        """Append flight data with separate time columns"""
+    def _flight_rows(ticket_data: Dict) -> List[List]:
+        """Flight rows with separate time columns"""
         passengers = ticket_data.get('passengers', [])
         if not passengers:
-            return False
+            return []
         
         rows = []
         for pax in passengers:
@@ -831,20 +1203,25 @@ class GoogleSheetsManager:
             ]
             rows.append(row)
         
-        return GoogleSheetsManager._append_rows(rows)
+        return rows
     
     @staticmethod
     def _append_rows(rows: List) -> bool:
-        """Append rows"""
+        """Append rows to sheet"""
+        if not rows:
+            return True
+        
         try:
             body = {"values": rows}
-            sheets_service.spreadsheets().values().append(
+            # Append isn't idempotent: a 503 may have been applied already, so only
+            # retry 429 (rejected before any write) to avoid duplicating the batch
+            _execute_with_retry(_get_sheets().spreadsheets().values().append(
                 spreadsheetId=SHEET_ID,
                 range=f"{SHEET_NAME}!A:M",
                 valueInputOption="RAW",
                 insertDataOption="INSERT_ROWS",
                 body=body
-            ).execute()
+            ), retry_statuses=(429,))
             
             print(f"✓ Appended {len(rows)} rows")
             return True
@@ -864,9 +1241,10 @@ class DriveManager:
         page_token = None
         
         while True:
-            resp = drive_service.files().list(
+            resp = _get_drive().files().list(
                 q=q, spaces='drive',
-                fields="nextPageToken, files(id, name, mimeType, createdTime)",
+                fields="nextPageToken, files(id, name, mimeType, size, md5Checksum)",
+                pageSize=1000,
                 pageToken=page_token
             ).execute()
             
@@ -878,23 +1256,22 @@ class DriveManager:
         return files
     
     @staticmethod
-    def download_file(file_id: str) -> bytes:
-        """Download file"""
-        request = drive_service.files().get_media(fileId=file_id)
+    def download_file(file_id: str) -> io.BytesIO:
+        """Download file into memory (returned buffer is rewound)"""
         fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        
-        while not done:
-            _, done = downloader.next_chunk()
+        with _get_drive_session().get(DRIVE_MEDIA_URL.format(file_id=file_id), stream=True,
+                                      timeout=DRIVE_DOWNLOAD_TIMEOUT) as resp:
+            resp.raise_for_status()
+            for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                fh.write(chunk)
         
         fh.seek(0)
-        return fh.read()
+        return fh
     
     @staticmethod
     def move_file(file_id: str, dest_folder_id: str, source_folder_id: str):
         """Move file"""
-        drive_service.files().update(
+        _get_drive().files().update(
             fileId=file_id,
             addParents=dest_folder_id,
             removeParents=source_folder_id,
@@ -927,33 +1304,75 @@ class WeddingTicketAutomation:
         success = 0
         errors = 0
         error_files = []
+        processed_ids = []
+        ticket_rows = []
         
-        for file_meta in files:
+        # Stage 1: parallel downloads in the background, OCR starts as each file lands
+        # A slot is held from submit until the OCR loop takes the file off the queue
+        download_queue = queue.Queue()
+        download_slots = threading.Semaphore(PIPELINE_QUEUE_SIZE)
+        
+        def _download_one(file_meta: Dict):
+            try:
+                download_queue.put((file_meta, self.drive.download_file(file_meta['id']), None))
+            except Exception as e:
+                download_queue.put((file_meta, None, e))
+        
+        def _download_all():
+            with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as ex:
+                for file_meta in files:
+                    download_slots.acquire()
+                    ex.submit(_download_one, file_meta)
+            download_queue.put(None)
+        
+        tickets = []
+        with ThreadPoolExecutor(max_workers=1) as downloader:
+            downloader.submit(_download_all)
+            
+            while True:
+                item = download_queue.get()
+                if item is None:
+                    break
+                download_slots.release()
+                
+                file_meta, file_buf, download_error = item
+                filename = file_meta['name']
+                try:
+                    if download_error:
+                        raise download_error
+                    ticket = self.processor.ocr_ticket(
+                        file_buf, filename, file_meta.get('mimeType', ''),
+                        reload=functools.partial(self.drive.download_file, file_meta['id'])
+                    )
+                    tickets.append((file_meta, ticket))
+                
+                except Exception as e:
+                    print(f"✗ Critical error: {e}\n")
+                    import traceback
+                    traceback.print_exc()
+                    errors += 1
+                    error_files.append(f"{filename}: Critical error - {str(e)}")
+        
+        # Stage 2: all train PNR lookups in one concurrent batch
+        self.processor.prefetch_train_pnrs([ticket for _, ticket in tickets])
+        
+        # Stage 3: extract details + queue sheet rows
+        for file_meta, ticket in tickets:
             try:
                 file_id = file_meta['id']
                 filename = file_meta['name']
-                mime_type = file_meta.get('mimeType', '')
                 
-                file_bytes = self.drive.download_file(file_id)
-                ticket_data = self.processor.process_ticket(file_bytes, filename, mime_type)
+                ticket_data = self.processor.finish_ticket(ticket)
                 
                 # Always append (including errors)
-                self.sheets.append_ticket_data(ticket_data)
+                ticket_rows.append(ticket_data)
                 
                 if ticket_data.get('error'):
                     errors += 1
                     error_files.append(f"{filename}: {ticket_data.get('error')}")
                 else:
                     success += 1
-                    
-                    if PROCESSED_FOLDER_ID and len(PROCESSED_FOLDER_ID) > 5:
-                        try:
-                            self.drive.move_file(file_id, PROCESSED_FOLDER_ID, DRIVE_FOLDER_ID)
-                            print("✓ Moved\n")
-                        except:
-                            print("⚠ Move skipped\n")
-                    else:
-                        print("⚠ Move skipped\n")
+                    processed_ids.append(file_id)
             
             except Exception as e:
                 print(f"✗ Critical error: {e}\n")
@@ -962,6 +1381,21 @@ class WeddingTicketAutomation:
                 errors += 1
                 error_files.append(f"{filename}: Critical error - {str(e)}")
         
+        # One append request for every ticket row
+        if not self.sheets.append_ticket_data(ticket_rows):
+            print("⚠ Sheet append failed - leaving files in place for the next run")
+            processed_ids = []
+
+        if PROCESSED_FOLDER_ID and len(PROCESSED_FOLDER_ID) > 5:
+            for file_id in processed_ids:
+                try:
+                    self.drive.move_file(file_id, PROCESSED_FOLDER_ID, DRIVE_FOLDER_ID)
+                    print(f"✓ Moved {file_id}")
+                except:
+                    print(f"⚠ Move skipped {file_id}")
+        elif processed_ids:
+            print("⚠ Move skipped")
+        
         print("\n" + "="*70)
         print(f"SUMMARY: {success} ✓ SUCCESS | {errors} ✗ ERRORS")
         print("="*70)
@@ -6,14 +6,21 @@ If journey_date >= 2026-02-13 → DEPARTURE, write journey_date
 
 import os
 import re
-from typing import List, Dict, Tuple, Optional
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Optional, NamedTuple
 from datetime import date as _date
 
-from rapidfuzz import fuzz
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
 from dateutil import parser as dparser
 from dotenv import load_dotenv
+import google_auth_httplib2
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
+from googleapiclient.http import build_http
 
 load_dotenv()
 
@@ -28,35 +35,94 @@ SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets"
 ]
 
-creds = service_account.Credentials.from_service_account_file(
-    SERVICE_ACCOUNT_FILE, scopes=SCOPES
-)
-sheets_service = build("sheets", "v4", credentials=creds)
+
+# Lazy: server.py and the matcher tests import this module without a service account
+@functools.lru_cache(maxsize=1)
+def _get_creds() -> service_account.Credentials:
+    return service_account.Credentials.from_service_account_file(
+        SERVICE_ACCOUNT_FILE, scopes=SCOPES
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _get_spreadsheets():
+    return build("sheets", "v4", credentials=_get_creds(), cache_discovery=False).spreadsheets()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_values():
+    return _get_spreadsheets().values()
+
+
+# httplib2 is not thread-safe: each read thread executes on its own connection
+_http_local = threading.local()
+
+
+def _thread_http() -> google_auth_httplib2.AuthorizedHttp:
+    http = getattr(_http_local, "http", None)
+    if http is None:
+        # build_http keeps googleapiclient's default socket timeout
+        http = google_auth_httplib2.AuthorizedHttp(_get_creds(), http=build_http())
+        _http_local.http = http
+    return http
+
+
+READ_CHUNK_ROWS = 5000  # rows per values.get slice
+READ_WORKERS = 4  # slices fetched concurrently
 
 MATCH_THRESHOLD = 85
 
 # Date routing: journey_date >= 2026-02-13 means DEPARTURE
 DEPARTURE_DATE = _date(2026, 2, 13)
 
+_TITLES_RE = re.compile(r"\b(KR|KUMAR|DEVI|SHRI|SMT|MR|MRS|MS|MISS|SRI)\b")
+_NONALPHA_RE = re.compile(r"[^A-Z ]")
+_WS_RE = re.compile(r"\s+")
+
+
+class Ticket(NamedTuple):
+    """One ticket-sheet row (columns A-R)"""
+    row_no: int
+    journey_date: str
+    departure_time: str
+    arrival_date: str
+    arrival_time: str
+    mode: str
+    seat: str
+    details: str
+    name: str
+    train_number: str
+    train_name: str
+    status: str
+    pnr: str
+    source: str
+    suggested: str
+    score: str
+    approved: str
+    commit_status: str
+    approve_commit: str
+
+
+TICKET_COLUMNS = len(Ticket._fields) - 1  # A-R
+
 
 class NameMatcher:
     """Partial matching for short master names"""
     
     @staticmethod
+    @functools.lru_cache(maxsize=8192)
     def normalize_name(name: str) -> str:
         """Remove titles, special chars, normalize spaces"""
         if not name:
             return ""
         
-        name = name.upper()
-        name = re.sub(r"\b(KR|KUMAR|DEVI|SHRI|SMT|MR|MRS|MS|MISS|SRI)\b", "", name)
-        name = re.sub(r"[^A-Z ]", "", name)
-        name = re.sub(r"\s+", " ", name).strip()
-        return name
+        name = _TITLES_RE.sub("", name.upper())
+        name = _NONALPHA_RE.sub("", name)
+        return _WS_RE.sub(" ", name).strip()
     
     @staticmethod
     def match_against_master(passenger_name: str, master_names: List[Dict]) -> Tuple[List[Dict], int]:
-        """Use partial_ratio for substring matching"""
+        """WRatio (best of ratio / partial / token strategies) against every master"""
         if not passenger_name or not master_names:
             return [], 0
         
@@ -66,9 +132,7 @@ class NameMatcher:
         best_score = 0
         
         for master in master_names:
-            partial_score = fuzz.partial_ratio(norm_passenger, master["norm"])
-            token_score = fuzz.token_sort_ratio(norm_passenger, master["norm"])
-            final_score = max(partial_score, token_score)
+            final_score = fuzz.WRatio(norm_passenger, master["norm"], score_cutoff=MATCH_THRESHOLD)
             
             if final_score >= MATCH_THRESHOLD:
                 matches.append({**master, "score": final_score})
@@ -77,6 +141,83 @@ class NameMatcher:
         
         matches.sort(key=lambda x: x["score"], reverse=True)
         return matches, best_score
+    
+    @staticmethod
+    def build_buckets(master_names: List[Dict]) -> Dict[str, List[int]]:
+        """Master indices keyed by the first two letters of every token
+        (single-letter initials by their one letter)"""
+        buckets = {}
+        for idx, master in enumerate(master_names):
+            for key in {token[:2] for token in master["norm"].split()}:
+                buckets.setdefault(key, []).append(idx)
+        return buckets
+    
+    @staticmethod
+    def score_matrix(passenger_norms: List[str], master_norms: List[str],
+                     buckets: Dict[str, List[int]]) -> np.ndarray:
+        """WRatio per passenger x master pair.
+        Only masters sharing a token prefix (or an initial) with the passenger are scored;
+        if none do, every master is scored."""
+        scores = np.zeros((len(passenger_norms), len(master_norms)))
+        
+        for i, norm in enumerate(passenger_norms):
+            if not norm:
+                continue
+            
+            # token[:1] hits masters that only have an initial ("R K GUPTA")
+            candidates = sorted({
+                j for token in norm.split()
+                for key in (token[:2], token[:1])
+                for j in buckets.get(key, ())
+            })
+            if not candidates:
+                # Every token garbled by OCR - fall back to the full master list
+                candidates = list(range(len(master_norms)))
+            if not candidates:
+                continue
+            
+            # Scores below threshold come back as 0
+            scores[i, candidates] = process.cdist(
+                [norm], [master_norms[j] for j in candidates], scorer=fuzz.WRatio,
+                score_cutoff=MATCH_THRESHOLD, dtype=np.float64
+            )[0]
+        
+        return scores
+    
+    @staticmethod
+    def ambiguous_matches(passenger_norms: List[str], master_norms: List[str],
+                          top_idx: np.ndarray, top_scores: np.ndarray) -> np.ndarray:
+        """Duplicate: runner-up also clears the threshold and is within 3 points of the best.
+        The margin uses unscaled max(partial_ratio, token_sort_ratio) on the top-k only -
+        WRatio's 0.9 partial scaling would split "SONAL" vs "Sonal" / "Sonal Sharma" 100/90"""
+        is_duplicate = np.zeros(len(passenger_norms), dtype=bool)
+        
+        for i in np.flatnonzero(top_scores[:, 1] >= MATCH_THRESHOLD):
+            cand_norms = [master_norms[j] for j, score in zip(top_idx[i], top_scores[i])
+                          if score >= MATCH_THRESHOLD]
+            partial = process.cdist([passenger_norms[i]], cand_norms, scorer=fuzz.partial_ratio)
+            token = process.cdist([passenger_norms[i]], cand_norms, scorer=fuzz.token_sort_ratio)
+            unscaled = np.sort(np.maximum(partial, token)[0])[::-1]
+            is_duplicate[i] = unscaled[0] - unscaled[1] <= 3
+        
+        return is_duplicate
+    
+    @staticmethod
+    def top_matches(scores: np.ndarray, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """Master indices and scores of the k best matches per passenger (best first)"""
+        rows, cols = scores.shape
+        top_idx = np.full((rows, k), -1)
+        top_scores = np.zeros((rows, k))
+        
+        n = min(k, cols)
+        if rows and n:
+            idx = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+            idx_scores = np.take_along_axis(scores, idx, axis=1)
+            order = np.argsort(-idx_scores, axis=1, kind="stable")
+            top_idx[:, :n] = np.take_along_axis(idx, order, axis=1)
+            top_scores[:, :n] = np.take_along_axis(idx_scores, order, axis=1)
+        
+        return top_idx, top_scores
 
 
 class DateHelper:
@@ -103,33 +244,96 @@ class DateHelper:
             return dt >= DEPARTURE_DATE  # >= not ==
         except Exception:
             return False
+    
+    @staticmethod
+    def parse_dates(date_strs: List[str]) -> pd.Series:
+        """Parse a whole column of dates in one pass (unparseable -> NaT)"""
+        return pd.to_datetime(pd.Series(date_strs, dtype=object), errors="coerce", format="mixed")
+    
+    @staticmethod
+    def format_dates(dates: pd.Series, originals: List[str]) -> List[str]:
+        """MM/DD/YY per date, keeping the original string where parsing failed"""
+        formatted = dates.dt.strftime("%m/%d/%y")
+        return [f if isinstance(f, str) else o for f, o in zip(formatted, originals)]
 
 
 class SheetManager:
     """Google Sheets operations"""
     
+    @staticmethod
+    def _as_text(value) -> str:
+        """Unformatted cells come back as numbers/bools - compare them as sheet text"""
+        if isinstance(value, bool):
+            return "TRUE" if value else "FALSE"
+        return str(value)
+    
+    @staticmethod
+    def _read_rows(sheet: str, first_col: str, last_col: str) -> List[List]:
+        """Rows from row 2 down (sheet order kept).
+        The first slice uses the shared client; later slices are fetched concurrently."""
+        def _fetch(start: int, end: int, http=None) -> List[List]:
+            resp = _get_values().get(
+                spreadsheetId=SHEET_ID,
+                range=f"{sheet}!{first_col}{start}:{last_col}{end}",
+                majorDimension="ROWS",
+                valueRenderOption="UNFORMATTED_VALUE",
+                dateTimeRenderOption="FORMATTED_STRING"
+            ).execute(http=http)
+            return resp.get("values", [])
+        
+        def _row_count() -> int:
+            meta = _get_spreadsheets().get(
+                spreadsheetId=SHEET_ID,
+                ranges=[sheet],
+                fields="sheets(properties(gridProperties(rowCount)))"
+            ).execute(http=_thread_http())
+            return meta["sheets"][0]["properties"]["gridProperties"]["rowCount"]
+        
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as ex:
+            # Sheet size comes from rowCount, fetched alongside the first slice -
+            # a short slice only means its trailing rows are blank
+            row_count_future = ex.submit(_row_count)
+            first_end = READ_CHUNK_ROWS + 1
+            rows = _fetch(2, first_end)
+            row_count = row_count_future.result()
+            
+            slices = [
+                (start, min(start + READ_CHUNK_ROWS - 1, row_count))
+                for start in range(first_end + 1, row_count + 1, READ_CHUNK_ROWS)
+            ]
+            if slices:
+                # The API drops trailing blank rows - pad so later slices keep their row numbers
+                rows += [[]] * (first_end - 1 - len(rows))
+            
+            chunks = ex.map(lambda bounds: _fetch(*bounds, http=_thread_http()), slices)
+            for (start, end), chunk in zip(slices, chunks):
+                rows.extend(chunk + [[]] * (end - start + 1 - len(chunk)))
+        
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+    
     @staticmethod
     def read_master_names() -> List[Dict]:
         """Load master guest list with context"""
         print(f"\n📘 Loading master names from '{MASTER_SHEET}' sheet")
         
-        resp = sheets_service.spreadsheets().values().get(
-            spreadsheetId=SHEET_ID,
-            range=f"{MASTER_SHEET}!A2:D"
-        ).execute()
+        rows = SheetManager._read_rows(MASTER_SHEET, "A", "D")
         
-        rows = resp.get("values", [])
         master_names = []
         
         for i, row in enumerate(rows, start=2):
+            row = [SheetManager._as_text(v) for v in row]
             if row and row[0].strip():
                 raw_name = row[0].strip()
                 place = row[2] if len(row) > 2 else ""
                 venue = row[3] if len(row) > 3 else ""
                 
+                norm = NameMatcher.normalize_name(raw_name)
                 master_names.append({
                     "raw": raw_name,
-                    "norm": NameMatcher.normalize_name(raw_name),
+                    "upper": raw_name.upper(),
+                    "norm": norm,
                     "row_no": i,
                     "place": place,
                     "venue": venue
@@ -139,43 +343,20 @@ class SheetManager:
         return master_names
     
     @staticmethod
-    def read_ticket_sheet() -> List[Dict]:
+    def read_ticket_sheet() -> List[Ticket]:
         """Load all tickets"""
         print(f"\n📄 Loading tickets from '{TICKET_SHEET}' sheet")
         
-        resp = sheets_service.spreadsheets().values().get(
-            spreadsheetId=SHEET_ID,
-            range=f"{TICKET_SHEET}!A2:R"
-        ).execute()
-        
-        rows = resp.get("values", [])
+        rows = SheetManager._read_rows(TICKET_SHEET, "A", "R")
         tickets = []
         
         for idx, row in enumerate(rows, start=2):
             if len(row) < 8:
                 continue
             
-            tickets.append({
-                "row_no": idx,
-                "journey_date": row[0] if len(row) > 0 else "",
-                "departure_time": row[1] if len(row) > 1 else "",
-                "arrival_date": row[2] if len(row) > 2 else "",
-                "arrival_time": row[3] if len(row) > 3 else "",
-                "mode": row[4] if len(row) > 4 else "",
-                "seat": row[5] if len(row) > 5 else "",
-                "details": row[6] if len(row) > 6 else "",
-                "name": row[7] if len(row) > 7 else "",
-                "train_number": row[8] if len(row) > 8 else "",
-                "train_name": row[9] if len(row) > 9 else "",
-                "status": row[10] if len(row) > 10 else "",
-                "pnr": row[11] if len(row) > 11 else "",
-                "source": row[12] if len(row) > 12 else "",
-                "suggested": row[13] if len(row) > 13 else "",
-                "score": row[14] if len(row) > 14 else "",
-                "approved": row[15] if len(row) > 15 else "",
-                "commit_status": row[16] if len(row) > 16 else "",
-                "approve_commit": row[17] if len(row) > 17 else ""
-            })
+            row = [SheetManager._as_text(v) for v in row[:TICKET_COLUMNS]]
+            row += [""] * (TICKET_COLUMNS - len(row))
+            tickets.append(Ticket(idx, *row))
         
         print(f"✅ Loaded {len(tickets)} tickets")
         return tickets
@@ -183,27 +364,61 @@ class SheetManager:
     @staticmethod
     def write_match_result(row_no: int, suggested_name: str, score: int):
         """Write match suggestion to columns N-O"""
-        sheets_service.spreadsheets().values().update(
+        SheetManager.batch_update_match_results([(row_no, suggested_name, score)])
+    
+    @staticmethod
+    def batch_update_match_results(updates: List[Tuple[int, str, int]]):
+        """Batch write match suggestions to columns N-O"""
+        if not updates:
+            return
+        
+        data = []
+        for row_no, suggested_name, score in updates:
+            data.append({
+                "range": f"{TICKET_SHEET}!N{row_no}:O{row_no}",
+                "values": [[suggested_name, score]]
+            })
+        
+        _get_values().batchUpdate(
             spreadsheetId=SHEET_ID,
-            range=f"{TICKET_SHEET}!N{row_no}:O{row_no}",
-            valueInputOption="RAW",
-            body={"values": [[suggested_name, score]]}
+            body={
+                "valueInputOption": "RAW",
+                "data": data
+            }
         ).execute()
+        
+        print(f"\n✍️  Wrote {len(updates)} match results")
     
     @staticmethod
     def write_approved_name(row_no: int, approved_name: str):
         """Write approved name to column P"""
-        sheets_service.spreadsheets().values().update(
+        SheetManager.batch_update_approved_names([(row_no, approved_name)])
+    
+    @staticmethod
+    def batch_update_approved_names(updates: List[Tuple[int, str]]):
+        """Batch write approved names to column P"""
+        if not updates:
+            return
+        
+        data = []
+        for row_no, approved_name in updates:
+            data.append({
+                "range": f"{TICKET_SHEET}!P{row_no}",
+                "values": [[approved_name]]
+            })
+        
+        _get_values().batchUpdate(
             spreadsheetId=SHEET_ID,
-            range=f"{TICKET_SHEET}!P{row_no}",
-            valueInputOption="RAW",
-            body={"values": [[approved_name]]}
+            body={
+                "valueInputOption": "RAW",
+                "data": data
+            }
         ).execute()
     
     @staticmethod
     def write_status(row_no: int, status: str):
         """Write status to column Q"""
-        sheets_service.spreadsheets().values().update(
+        _get_values().update(
             spreadsheetId=SHEET_ID,
             range=f"{TICKET_SHEET}!Q{row_no}",
             valueInputOption="RAW",
@@ -218,7 +433,7 @@ class SheetManager:
         
         print(f"\n✍️  Batch updating {len(updates)} records in Master sheet...")
         
-        sheets_service.spreadsheets().values().batchUpdate(
+        _get_values().batchUpdate(
             spreadsheetId=SHEET_ID,
             body={
                 "valueInputOption": "USER_ENTERED",
@@ -241,7 +456,7 @@ class SheetManager:
                 "values": [[status]]
             })
         
-        sheets_service.spreadsheets().values().batchUpdate(
+        _get_values().batchUpdate(
             spreadsheetId=SHEET_ID,
             body={
                 "valueInputOption": "RAW",
@@ -259,7 +474,7 @@ class VerificationWorkflow:
         self.date_helper = DateHelper()
     
     def step1_match_and_suggest(self):
-        """Step 1: Match with partial_ratio"""
+        """Step 1: Match with WRatio"""
         print("\n" + "="*80)
         print("STEP 1: AUTO-MATCH PASSENGERS")
         print("="*80)
@@ -272,15 +487,17 @@ class VerificationWorkflow:
         matched = 0
         unmatched = 0
         duplicates = 0
+        match_updates = []
         
+        pending = []
         for ticket in tickets:
-            passenger_name = ticket["name"]
-            row_no = ticket["row_no"]
+            passenger_name = ticket.name
+            row_no = ticket.row_no
 
-            if ticket.get("commit_status") == "COMMITTED":
+            if ticket.commit_status == "COMMITTED":
                 continue
             
-            if ticket["mode"] == "ERROR":
+            if ticket.mode == "ERROR":
                 print(f"⏭️  Row {row_no}: Skipping ERROR row")
                 continue
             
@@ -288,39 +505,48 @@ class VerificationWorkflow:
                 print(f"⏭️  Row {row_no}: No passenger name")
                 continue
             
-            print(f"\n📍 Row {row_no} | {passenger_name} ({ticket['mode']})")
+            pending.append(ticket)
+        
+        # Score each passenger against the masters sharing a name prefix
+        passenger_norms = [self.matcher.normalize_name(t.name) for t in pending]
+        master_norms = [m["norm"] for m in master_names]
+        scores = self.matcher.score_matrix(
+            passenger_norms, master_norms, self.matcher.build_buckets(master_names)
+        )
+        top_idx, top_scores = self.matcher.top_matches(scores, k=3)
+        match_counts = (scores >= MATCH_THRESHOLD).sum(axis=1)
+        is_duplicate = self.matcher.ambiguous_matches(passenger_norms, master_norms, top_idx, top_scores)
+        
+        for i, ticket in enumerate(pending):
+            row_no = ticket.row_no
+            print(f"\n📍 Row {row_no} | {ticket.name} ({ticket.mode})")
             
-            matches, best_score = self.matcher.match_against_master(passenger_name, master_names)
+            best_score = float(top_scores[i, 0]) if match_counts[i] else 0
             
-            if len(matches) > 1:
-                if len(matches) >= 2 and (matches[0]["score"] - matches[1]["score"]) <= 3:
-                    print(f"   ⚠️  DUPLICATE: Found {len(matches)} similar matches:")
-                    for m in matches[:3]:
-                        print(f"      - {m['raw']} (row {m['row_no']}) [{m['score']:.0f}] - {m['place']} {m['venue']}")
-                    
-                    self.sheet_mgr.write_match_result(
-                        row_no, 
-                        f"DUPLICATE: {matches[0]['raw']}", 
-                        best_score
-                    )
-                    duplicates += 1
-                else:
-                    match = matches[0]
-                    self.sheet_mgr.write_match_result(row_no, match["raw"], best_score)
-                    print(f"   ✅ Matched: {match['raw']} (row {match['row_no']}) [{best_score:.0f}]")
-                    matched += 1
+            if is_duplicate[i]:
+                print(f"   ⚠️  DUPLICATE: Found {match_counts[i]} similar matches:")
+                for j, score in zip(top_idx[i], top_scores[i]):
+                    if score >= MATCH_THRESHOLD:
+                        m = master_names[j]
+                        print(f"      - {m['raw']} (row {m['row_no']}) [{score:.0f}] - {m['place']} {m['venue']}")
+                
+                best = master_names[top_idx[i, 0]]
+                match_updates.append((row_no, f"DUPLICATE: {best['raw']}", best_score))
+                duplicates += 1
                 
-            elif len(matches) == 1:
-                match = matches[0]
-                self.sheet_mgr.write_match_result(row_no, match["raw"], best_score)
+            elif match_counts[i]:
+                match = master_names[top_idx[i, 0]]
+                match_updates.append((row_no, match["raw"], best_score))
                 print(f"   ✅ Matched: {match['raw']} (row {match['row_no']}) [{best_score:.0f}]")
                 matched += 1
                 
             else:
-                self.sheet_mgr.write_match_result(row_no, "", best_score)
+                match_updates.append((row_no, "", best_score))
                 print(f"   ❌ No match (best score={best_score:.0f})")
                 unmatched += 1
         
+        self.sheet_mgr.batch_update_match_results(match_updates)
+        
         print("\n" + "="*80)
         print(f"✅ STEP 1 COMPLETE")
         print(f"   → Matched: {matched}")
@@ -344,13 +570,14 @@ class VerificationWorkflow:
         # Phase 1: Auto-fill
         print("Phase 1: Auto-filling...")
         autofilled = 0
+        approved_updates = []
         
-        for ticket in tickets:
-            row_no = ticket["row_no"]
-            suggested = ticket["suggested"]
-            approved = ticket["approved"]
+        for i, ticket in enumerate(tickets):
+            row_no = ticket.row_no
+            suggested = ticket.suggested
+            approved = ticket.approved
             
-            if ticket["mode"] == "ERROR":
+            if ticket.mode == "ERROR":
                 continue
             
             if "DUPLICATE" in suggested:
@@ -358,56 +585,57 @@ class VerificationWorkflow:
                 continue
             
             if not approved and suggested:
-                self.sheet_mgr.write_approved_name(row_no, suggested)
+                approved_updates.append((row_no, suggested))
                 print(f"✓ Row {row_no}: '{suggested}'")
-                ticket["approved"] = suggested
+                tickets[i] = ticket._replace(approved=suggested)
                 autofilled += 1
         
+        self.sheet_mgr.batch_update_approved_names(approved_updates)
         print(f"\n✅ Auto-filled {autofilled} rows\n")
         
-        # Reload
-        tickets = self.sheet_mgr.read_ticket_sheet()
-        
+        # Phase 2 works on the in-memory tickets (approved already patched above)
         # Phase 2: Commit
         print("Phase 2: Committing...")
         
         master_updates = []
         status_updates = []
         committed = 0
-        skipped = 0
         errors = 0
         
-        for ticket in tickets:
-            row_no = ticket["row_no"]
-            approved_name = ticket["approved"]
-            journey_date = ticket["journey_date"]
-            arrival_date = ticket["arrival_date"]
-            departure_time = ticket["departure_time"]
-            arrival_time = ticket["arrival_time"]
-            seat = ticket["seat"]
-            train_number = ticket["train_number"]
-            train_name = ticket["train_name"]
-            mode = ticket["mode"]
-            
-            if not approved_name or mode == "ERROR":
-                skipped += 1
-                continue
-
-            # if ticket["approve_commit"] != "TRUE":
-            if ticket.get("approve_commit") != "TRUE":
-                skipped += 1
-                continue
-            
-            if ticket.get("commit_status") == "COMMITTED":
-                skipped += 1
-                continue
+        # Exact-name lookup; the first master row wins on duplicate names
+        master_index = {}
+        for m in master_names:
+            master_index.setdefault(m["upper"], m)
+        
+        # Only approved, uncommitted rows need date parsing and a master lookup
+        to_commit = [
+            t for t in tickets
+            if t.approved and t.mode != "ERROR"
+            and t.approve_commit == "TRUE" and t.commit_status != "COMMITTED"
+        ]
+        skipped = len(tickets) - len(to_commit)
+        
+        # Parse all journey/arrival dates up front instead of per row
+        journey_raw = [t.journey_date for t in to_commit]
+        arrival_raw = [t.arrival_date for t in to_commit]
+        journey_dt = self.date_helper.parse_dates(journey_raw)
+        is_departure_row = (journey_dt >= pd.Timestamp(DEPARTURE_DATE)).to_numpy()
+        journey_fmt = self.date_helper.format_dates(journey_dt, journey_raw)
+        arrival_fmt = self.date_helper.format_dates(self.date_helper.parse_dates(arrival_raw), arrival_raw)
+        
+        for i, ticket in enumerate(to_commit):
+            row_no = ticket.row_no
+            approved_name = ticket.approved
+            departure_time = ticket.departure_time
+            arrival_time = ticket.arrival_time
+            seat = ticket.seat
+            train_number = ticket.train_number
+            train_name = ticket.train_name
+            mode = ticket.mode
             
             # Find exact match
-            match = None
-            for m in master_names:
-                if m["raw"].upper() == approved_name.upper():
-                    match = m
-                    break
+            key = approved_name.upper()
+            match = master_index.get(key)
             
             if not match:
                 status_updates.append((row_no, f"ERROR: '{approved_name}' not found"))
@@ -422,46 +650,34 @@ class VerificationWorkflow:
             # journey_date >= 2026-02-13 → DEPARTURE
             # journey_date < 2026-02-13 → ARRIVAL
             
-            is_departure = self.date_helper.is_departure_date(journey_date)
-            
-            if is_departure:
+            if is_departure_row[i]:
                 # DEPARTURE: Write journey_date
-                date_to_write = journey_date
                 trip_type = "DEPARTURE"
                 
-                formatted_date = self.date_helper.format_mmddyy(date_to_write)
+                formatted_date = journey_fmt[i]
                 time_value = departure_time if departure_time else arrival_time
                 
                 # DEPARTURE COLUMNS (AE-AJ)
-                master_updates.extend([
-                    {"range": f"{MASTER_SHEET}!AE{master_row}", "values": [[formatted_date]]},
-                    {"range": f"{MASTER_SHEET}!AF{master_row}", "values": [[mode]]},
-                    {"range": f"{MASTER_SHEET}!AG{master_row}", "values": [[seat]]},
-                    {"range": f"{MASTER_SHEET}!AH{master_row}", "values": [[train_number]]},
-                    {"range": f"{MASTER_SHEET}!AI{master_row}", "values": [[train_name]]},
-                    {"range": f"{MASTER_SHEET}!AJ{master_row}", "values": [[time_value]]},
-                ])
+                master_updates.append({
+                    "range": f"{MASTER_SHEET}!AE{master_row}:AJ{master_row}",
+                    "values": [[formatted_date, mode, seat, train_number, train_name, time_value]]
+                })
             else:
                 # ARRIVAL: Write journey_date (or arrival_date for flights if available)
                 if mode == "FLIGHT":
-                    date_to_write = journey_date
+                    formatted_date = journey_fmt[i]
                 else:
-                    date_to_write = arrival_date
+                    formatted_date = arrival_fmt[i]
                 
                 trip_type = "ARRIVAL"
                 
-                formatted_date = self.date_helper.format_mmddyy(date_to_write)
                 time_value = arrival_time if arrival_time else departure_time
                 
                 # ARRIVAL COLUMNS (I-N)
-                master_updates.extend([
-                    {"range": f"{MASTER_SHEET}!I{master_row}", "values": [[formatted_date]]},
-                    {"range": f"{MASTER_SHEET}!J{master_row}", "values": [[mode]]},
-                    {"range": f"{MASTER_SHEET}!K{master_row}", "values": [[seat]]},
-                    {"range": f"{MASTER_SHEET}!L{master_row}", "values": [[train_number]]},
-                    {"range": f"{MASTER_SHEET}!M{master_row}", "values": [[train_name]]},
-                    {"range": f"{MASTER_SHEET}!N{master_row}", "values": [[time_value]]},
-                ])
+                master_updates.append({
+                    "range": f"{MASTER_SHEET}!I{master_row}:N{master_row}",
+                    "values": [[formatted_date, mode, seat, train_number, train_name, time_value]]
+                })
             
             status_updates.append((row_no, "COMMITTED"))
             print(f"✅ [{mode} {trip_type}] {approved_name} → Master!{master_row} | {formatted_date} {train_number}")
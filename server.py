@@ -1,8 +1,50 @@
-from fastapi import FastAPI
+import queue
+import threading
+from collections import OrderedDict
+from uuid import uuid4
+
+from fastapi import FastAPI, HTTPException
 from _1_ticket_automation import WeddingTicketAutomation
 from _2_name_automation import VerificationWorkflow
 app = FastAPI()
 
+MAX_JOBS = 100  # oldest job statuses are dropped past this
+
+jobs = OrderedDict()  # job_id -> {"status": ..., "error": ...}
+_jobs_lock = threading.Lock()
+_queued_job_id = None  # a run that hasn't started yet picks up any new files too
+
+# Drive triggers can fire back-to-back; one worker runs ingests in order so files
+# aren't processed twice, and request threads never wait on it
+_pipeline_queue = queue.Queue()
+
+
+def _run_pipeline(job_id: str):
+    global _queued_job_id
+    with _jobs_lock:
+        if _queued_job_id == job_id:
+            _queued_job_id = None
+        jobs[job_id]["status"] = "running"
+    try:
+        automation = WeddingTicketAutomation()
+        automation.run()
+
+        workflow = VerificationWorkflow()
+        workflow.step1_match_and_suggest()  # auto-suggest names
+
+        jobs[job_id]["status"] = "ingested and matched"
+    except Exception as e:
+        jobs[job_id]["status"] = "failed"
+        jobs[job_id]["error"] = str(e)
+
+
+def _pipeline_worker():
+    while True:
+        _run_pipeline(_pipeline_queue.get())
+
+
+threading.Thread(target=_pipeline_worker, name="pipeline-worker", daemon=True).start()
+
 
 # @app.post("/step1-match")
 # def run_step1():
@@ -19,13 +61,25 @@ def run_step2():
 
 @app.post("/ingest-and-match")
 def ingest_ticket():
-    automation = WeddingTicketAutomation()
-    automation.run()
-
-    workflow = VerificationWorkflow()
-    workflow.step1_match_and_suggest()  # auto-suggest names
+    global _queued_job_id
+    with _jobs_lock:
+        # A run still waiting in the queue will see these files - share its job
+        if _queued_job_id:
+            return {"status": "queued", "job_id": _queued_job_id}
+        
+        job_id = uuid4().hex
+        jobs[job_id] = {"status": "queued", "error": None}
+        while len(jobs) > MAX_JOBS:
+            jobs.popitem(last=False)
+        _queued_job_id = job_id
+    _pipeline_queue.put(job_id)
+    return {"status": "queued", "job_id": job_id}
 
-    return {"status": "ingested and matched"}
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    if job_id not in jobs:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return {"job_id": job_id, **jobs[job_id]}
 
 # @app.post("/run-ticket-automation")
 # def run_automation():
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from rapidfuzz import fuzz, process
+
+from _2_name_automation import MATCH_THRESHOLD, NameMatcher
+
+
+INITIAL_MASTERS = ["R K Gupta", "S. Sharma", "Gupta Family"]
+OCR_MASTERS = ["Anil Santhalia", "Sonal Agarwal", "Sonal Aggarwal", "Ramesh Kumar"]
+
+
+def _masters(names):
+    return [{"raw": name, "norm": NameMatcher.normalize_name(name)} for name in names]
+
+
+def _scores(passengers, master_names):
+    masters = _masters(master_names)
+    return NameMatcher.score_matrix(
+        [NameMatcher.normalize_name(p) for p in passengers],
+        [m["norm"] for m in masters],
+        NameMatcher.build_buckets(masters),
+    )
+
+
+def _full_scores(passengers, master_names):
+    return process.cdist(
+        [NameMatcher.normalize_name(p) for p in passengers],
+        [NameMatcher.normalize_name(m) for m in master_names],
+        scorer=fuzz.WRatio, score_cutoff=MATCH_THRESHOLD, dtype=np.float64,
+    )
+
+
+def _best(passenger, master_names):
+    top_idx, top_scores = NameMatcher.top_matches(_scores([passenger], master_names))
+    if top_scores[0, 0] < MATCH_THRESHOLD:
+        return None
+    return master_names[top_idx[0, 0]]
+
+
+@pytest.mark.parametrize("passengers, master_names", [
+    (["Suresh Sharma", "Ravi Kumar Gupta", "Rk Gupta", "R Gupta"], INITIAL_MASTERS),
+    (["Xnil Santhalia", "Anil Xanthalia", "Xnil Xanthalia", "Sonal Agarwal"], OCR_MASTERS),
+])
+def test_prefilter_matches_full_scoring_on_sample_names(passengers, master_names):
+    np.testing.assert_array_equal(_scores(passengers, master_names), _full_scores(passengers, master_names))
+
+
+def test_full_first_name_matches_initial_master():
+    assert _best("Suresh Sharma", INITIAL_MASTERS) == "S. Sharma"
+
+
+def test_initials_prefer_initial_master_over_surname_only():
+    assert _best("Rk Gupta", INITIAL_MASTERS) == "R K Gupta"
+
+
+def test_ocr_corrupted_leading_letter():
+    assert _best("Xnil Santhalia", OCR_MASTERS) == "Anil Santhalia"
+
+
+def test_every_token_corrupted_falls_back_to_all_masters():
+    assert _best("Xnil Xanthalia", OCR_MASTERS) == "Anil Santhalia"
+
+
+def test_no_masters():
+    assert _scores(["Anil Santhalia"], []).shape == (1, 0)
+
+
+def _is_duplicate(passenger, master_names):
+    top_idx, top_scores = NameMatcher.top_matches(_scores([passenger], master_names))
+    return bool(NameMatcher.ambiguous_matches(
+        [NameMatcher.normalize_name(passenger)],
+        [NameMatcher.normalize_name(m) for m in master_names],
+        top_idx, top_scores,
+    )[0])
+
+
+def test_short_name_matching_short_and_long_master_is_duplicate():
+    assert _is_duplicate("SONAL", ["Sonal", "Sonal Sharma"])
+
+
+@pytest.mark.parametrize("passenger, master_names", [
+    ("Ramesh Gupta", ["Ramesh Gupta", "Rakesh Gupta"]),
+    ("Priya Sharma", ["Priya Sharma", "Priyanka Sharma"]),
+    ("Sonal Agarwal", OCR_MASTERS),
+])
+def test_exact_match_with_weaker_sibling_stays_match(passenger, master_names):
+    assert not _is_duplicate(passenger, master_names)
+    assert _best(passenger, master_names) == passenger
+
+
+def test_equally_close_masters_are_duplicate():
+    assert _is_duplicate("Sonal Agarwal", ["Sonal Agarwal", "Sonal Agarwal Jain"])
+
+
+def test_single_match_is_not_duplicate():
+    assert not _is_duplicate("Anil Santhalia", OCR_MASTERS)
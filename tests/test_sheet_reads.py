@@ -0,0 +1,68 @@
+import re
+
+import pytest
+
+import _2_name_automation as automation
+from _2_name_automation import SheetManager
+
+
+class _Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self, http=None):
+        return self.result
+
+
+class _FakeValues:
+    """values().get over {row_no: row}, trimming trailing blank rows like the API does"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, **kwargs):
+        start, end = map(int, re.findall(r"\d+", kwargs["range"].split("!")[1]))
+        rows = [self.data.get(r, []) for r in range(start, end + 1)]
+        while rows and not rows[-1]:
+            rows.pop()
+        return _Request({"values": rows} if rows else {})
+
+
+class _FakeSpreadsheets:
+    def __init__(self, row_count):
+        self.row_count = row_count
+
+    def get(self, **kwargs):
+        return _Request({"sheets": [{"properties": {"gridProperties": {"rowCount": self.row_count}}}]})
+
+
+@pytest.fixture
+def fake_sheet(monkeypatch):
+    def _install(data, row_count, chunk_rows):
+        monkeypatch.setattr(automation, "_get_values", lambda: _FakeValues(data))
+        monkeypatch.setattr(automation, "_get_spreadsheets", lambda: _FakeSpreadsheets(row_count))
+        monkeypatch.setattr(automation, "_thread_http", lambda: None)
+        monkeypatch.setattr(automation, "READ_CHUNK_ROWS", chunk_rows)
+        return SheetManager._read_rows("Master", "A", "D")
+    return _install
+
+
+def _numbered(rows):
+    return {row_no: row[0] for row_no, row in enumerate(rows, start=2) if row}
+
+
+def test_blank_row_at_slice_boundary_keeps_later_rows(fake_sheet):
+    data = {r: [f"name {r}"] for r in range(2, 121) if r != 11}  # row 11 ends the first slice
+    rows = fake_sheet(data, row_count=120, chunk_rows=10)
+    assert _numbered(rows) == {r: v[0] for r, v in data.items()}
+
+
+def test_blank_slice_in_the_middle(fake_sheet):
+    data = {r: [f"name {r}"] for r in list(range(2, 6)) + list(range(30, 35))}
+    rows = fake_sheet(data, row_count=50, chunk_rows=10)
+    assert _numbered(rows) == {r: v[0] for r, v in data.items()}
+
+
+def test_small_sheet_trims_trailing_blanks(fake_sheet):
+    rows = fake_sheet({2: ["a"], 4: ["b"]}, row_count=1000, chunk_rows=5000)
+    assert rows == [["a"], [], ["b"]]